@@ -7,16 +7,17 @@ import socket
 import sys
 import threading
 import time
+from functools import partial
 from pathlib import Path
-from typing import Any, Callable, Dict, Optional
+from typing import Any, Callable, Dict, Optional, Tuple
 import base64
 import os
 from cryptography.fernet import Fernet
 
 import requests
 
-from PyQt6.QtCore import Qt
-from PyQt6.QtGui import QColor
+from PyQt6.QtCore import QObject, Qt, QThread, pyqtSignal, pyqtSlot
+from PyQt6.QtGui import QCloseEvent, QColor
 from PyQt6.QtWidgets import (
     QApplication,
     QComboBox,
@@ -36,6 +37,57 @@ from PyQt6.QtWidgets import (
     QWidget,
 )
 
+try:
+    import orjson
+
+    _dumps = orjson.dumps
+    _loads = orjson.loads
+except ImportError:
+    def _dumps(obj: Any) -> bytes:
+        return json.dumps(obj).encode("utf-8")
+
+    _loads = json.loads
+
+
+# [\W_] is exactly the complement of str.isalnum().
+_NON_ALNUM_RE = re.compile(r"[\W_]+")
+
+# Every byte except ASCII letters and digits; deleting these from a beacon's
+# MAC prefix matches AtombergClient._normalize_device_id without decoding.
+_NON_ALNUM_BYTES = bytes(b for b in range(256) if not (b < 128 and chr(b).isalnum()))
+
+
+def _bool_command_encoder(key: str) -> Callable[[bool], bytes]:
+    on, off = _dumps({key: True}), _dumps({key: False})
+    return lambda value: on if value else off
+
+
+def _int_command_encoder(key: str) -> Callable[[int], bytes]:
+    template = b'{"' + key.encode("ascii") + b'":%d}'
+    return lambda value: template % value
+
+
+# Every GUI action and CLI shortcut sends one of these single-key commands, so
+# they get specialised encoders instead of a general JSON encode. The expected
+# value type is checked so that {"power": 1} (raw CLI input) is not sent as true.
+_COMMAND_ENCODERS: Dict[str, Tuple[type, Callable[[Any], bytes]]] = {
+    "power": (bool, _bool_command_encoder("power")),
+    "sleep": (bool, _bool_command_encoder("sleep")),
+    "led": (bool, _bool_command_encoder("led")),
+    "speed": (int, _int_command_encoder("speed")),
+    "timer": (int, _int_command_encoder("timer")),
+}
+
+
+def _encode_command(command: Dict[str, Any]) -> bytes:
+    if len(command) == 1:
+        ((key, value),) = command.items()
+        entry = _COMMAND_ENCODERS.get(key)
+        if entry is not None and type(value) is entry[0]:
+            return entry[1](value)
+    return _dumps(command)
+
+
 def resource_path(relative_path):
     try:
         base_path = sys._MEIPASS
@@ -105,13 +157,16 @@ class AtombergClient:
         self._beacon_map: Dict[str, Dict[str, Any]] = {}
         self._beacon_lock = threading.Lock()
         self._listener_started = False
+        self._listener_sock: Optional[socket.socket] = None
         self._listener_port = 5625
         self._command_port = 5600
         self._beacon_ttl_secs = 5
+        self._listener_rcvbuf = 1024 * 1024
+        self._command_socks: Dict[tuple, socket.socket] = {}
 
     @staticmethod
     def _normalize_device_id(value: str) -> str:
-        return "".join(ch for ch in value.lower() if ch.isalnum())
+        return _NON_ALNUM_RE.sub("", value.lower())
 
     def start_udp_listener(self) -> None:
         if self._listener_started:
@@ -123,36 +178,73 @@ class AtombergClient:
     def _udp_listener_loop(self) -> None:
         sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
         sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        # Lets the GUI and CLI (or several instances) all receive the broadcast
+        # beacons; macOS/BSD need SO_REUSEPORT for a shared UDP bind.
+        if hasattr(socket, "SO_REUSEPORT"):
+            sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEPORT, 1)
+        try:
+            # Room for beacon bursts while the listener thread is descheduled.
+            sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, self._listener_rcvbuf)
+        except OSError:
+            pass
         sock.bind(("0.0.0.0", self._listener_port))
         sock.settimeout(1.0)
+        self._listener_sock = sock
+        next_sweep = 0.0
+
+        # Hoisted out of the per-datagram loop.
+        recvfrom = sock.recvfrom
+        clock = time.time
+        beacon_lock = self._beacon_lock
+        beacon_map = self._beacon_map
+        ttl = self._beacon_ttl_secs
+        non_alnum = _NON_ALNUM_BYTES
 
         while True:
+            beacons: Dict[str, str] = {}
             try:
-                data, addr = sock.recvfrom(4096)
-                payload = data.decode(errors="ignore").strip()
-                # Atomberg beacons start with the 12-char device MAC (device_id).
-                if len(payload) >= 12:
-                    mac = self._normalize_device_id(payload[:12])
-                    if mac:
-                        with self._beacon_lock:
-                            self._beacon_map[mac] = {
-                                "ip": addr[0],
-                                "last_seen": time.time(),
-                            }
+                data, addr = recvfrom(4096)
+                # Drain everything already queued so a burst of beacons is
+                # recorded under a single lock acquisition.
+                sock.setblocking(False)
+                try:
+                    while True:
+                        # Atomberg beacons start with the 12-char device MAC
+                        # (device_id); only that prefix is read.
+                        head = data.strip()[:12]
+                        if len(head) >= 12:
+                            mac = head.lower().translate(None, non_alnum).decode("ascii")
+                            if mac:
+                                beacons[mac] = addr[0]
+                        data, addr = recvfrom(4096)
+                except BlockingIOError:
+                    pass
+                finally:
+                    sock.settimeout(1.0)
             except socket.timeout:
                 pass
             except OSError:
                 return
 
-            now = time.time()
-            with self._beacon_lock:
+            if beacons:
+                seen_at = clock()
+                with beacon_lock:
+                    for mac, ip in beacons.items():
+                        beacon_map[mac] = {"ip": ip, "last_seen": seen_at}
+
+            # Expire stale beacons at most once a second rather than per datagram.
+            now = clock()
+            if now < next_sweep:
+                continue
+            next_sweep = now + 1.0
+            with beacon_lock:
                 stale = [
                     key
-                    for key, info in self._beacon_map.items()
-                    if now - float(info.get("last_seen", 0)) > self._beacon_ttl_secs
+                    for key, info in beacon_map.items()
+                    if now - float(info.get("last_seen", 0)) > ttl
                 ]
                 for key in stale:
-                    del self._beacon_map[key]
+                    del beacon_map[key]
 
     def get_local_ip(self, device_id: str) -> Optional[str]:
         normalized = self._normalize_device_id(device_id)
@@ -181,12 +273,21 @@ class AtombergClient:
                 "and wait a few seconds for UDP beacons."
             )
 
-        payload = json.dumps(command).encode("utf-8")
-        sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        payload = _encode_command(command)
+        # One connected socket per fan, so switching fans does not reconnect and
+        # repeated commands skip address parsing.
+        target = (target_ip, self._command_port)
+        sock = self._command_socks.get(target)
+        if sock is None:
+            sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+            sock.connect(target)
+            self._command_socks[target] = sock
         try:
-            sock.sendto(payload, (target_ip, self._command_port))
-        finally:
-            sock.close()
+            sock.send(payload)
+        except ConnectionRefusedError:
+            # An ICMP error for an earlier datagram surfaces on the next send of a
+            # connected UDP socket; it has been cleared, so retry once.
+            sock.send(payload)
 
         return {
             "status": "Success",
@@ -196,6 +297,16 @@ class AtombergClient:
             "command": command,
         }
 
+    def close(self) -> None:
+        # Closing the listener socket makes its loop exit on the next recvfrom.
+        if self._listener_sock is not None:
+            self._listener_sock.close()
+            self._listener_sock = None
+            self._listener_started = False
+        for sock in self._command_socks.values():
+            sock.close()
+        self._command_socks.clear()
+
     def _request(
         self,
         method: str,
@@ -277,19 +388,172 @@ class AtombergClient:
         )
 
 
+_STYLESHEET = """
+QMainWindow {
+    background: #0b1220;
+}
+QWidget {
+    color: #d6e1ff;
+    font-family: "Avenir Next", "Helvetica Neue", "Segoe UI";
+    font-size: 14px;
+}
+QLabel#title {
+    font-size: 34px;
+    font-weight: 700;
+    color: #f1f5ff;
+}
+QLabel#subtitle {
+    font-size: 15px;
+    color: #98acd8;
+}
+QFrame#card {
+    background: qlineargradient(x1:0, y1:0, x2:1, y2:1,
+        stop:0 #121b31, stop:1 #1b2846);
+    border: 1px solid #2f4676;
+    border-radius: 14px;
+}
+QListWidget {
+    background: #111a2e;
+    border: 1px solid #2f4676;
+    border-radius: 10px;
+    padding: 6px;
+}
+QListWidget::item {
+    border-radius: 8px;
+    padding: 10px;
+    margin: 4px;
+    background: #16213b;
+}
+QListWidget::item:selected {
+    background: #2c4f94;
+    color: #f5f8ff;
+}
+QPushButton {
+    background: #28467f;
+    color: #f5f8ff;
+    border: 1px solid #3f63a8;
+    border-radius: 10px;
+    padding: 8px 14px;
+    font-weight: 600;
+}
+QPushButton:hover {
+    background: #365da7;
+}
+QPushButton:disabled {
+    background: #1b2a48;
+    color: #89a1d1;
+    border-color: #314a79;
+}
+QPushButton[variant="primary"] {
+    background: #21a07a;
+    border: 1px solid #35bb93;
+}
+QPushButton[variant="primary"]:hover {
+    background: #28bc90;
+}
+QPushButton[variant="danger"] {
+    background: #a73c52;
+    border: 1px solid #c4576e;
+}
+QPushButton[variant="danger"]:hover {
+    background: #bd4f67;
+}
+QPushButton[variant="ghost"] {
+    background: #17233e;
+    border: 1px solid #2f4676;
+}
+QGroupBox {
+    border: 1px solid #2f4676;
+    border-radius: 12px;
+    margin-top: 12px;
+    padding-top: 16px;
+    background: #111a2f;
+    font-weight: 600;
+}
+QGroupBox::title {
+    left: 12px;
+    padding: 0 6px;
+    color: #9db3e0;
+}
+QComboBox, QSpinBox {
+    background: #16213b;
+    border: 1px solid #35558f;
+    border-radius: 8px;
+    padding: 6px;
+    min-height: 20px;
+}
+QSlider::groove:horizontal {
+    border: 1px solid #35558f;
+    background: #182645;
+    height: 8px;
+    border-radius: 4px;
+}
+QSlider::handle:horizontal {
+    background: #2ec59a;
+    border: 1px solid #63d9b7;
+    width: 20px;
+    margin: -8px 0;
+    border-radius: 10px;
+}
+QStatusBar {
+    background: #0e1629;
+    border-top: 1px solid #243657;
+    color: #9eb2dc;
+}
+"""
+
+
+# Command key -> (device state key, cast) for optimistic UI updates.
+_COMMAND_STATE_FIELDS: Dict[str, Tuple[str, Callable[[Any], Any]]] = {
+    "power": ("power", bool),
+    "speed": ("last_recorded_speed", int),
+    "sleep": ("sleep_mode", bool),
+    "led": ("led", bool),
+    "timer": ("timer_hours", int),
+}
+
+
+class _CommandSender(QObject):
+    finished = pyqtSignal(dict)
+    failed = pyqtSignal(str)
+
+    def __init__(self, client: AtombergClient) -> None:
+        super().__init__()
+        self.client = client
+
+    @pyqtSlot(str, dict)
+    def send(self, device_id: str, command: Dict[str, Any]) -> None:
+        # May block for a couple of seconds while waiting for the fan's beacon.
+        try:
+            result = self.client.send_local_command(device_id, command)
+        except Exception as exc:  # pylint: disable=broad-except
+            self.failed.emit(str(exc))
+            return
+        self.finished.emit(result)
+
+
 class AtombergWindow(QMainWindow):
+    _send_requested = pyqtSignal(str, dict)
+
     def __init__(self, client: AtombergClient) -> None:
         super().__init__()
         self.client = client
         self.devices: list[Dict[str, Any]] = []
         self.selected_device: Optional[Dict[str, Any]] = None
+        self.selected_device_id: Optional[str] = None
         self.current_state: Dict[str, Any] = {}
+        # One long-lived worker keeps commands in click order and off the GUI thread.
+        self._command_thread = QThread(self)
+        self._command_sender = _CommandSender(client)
+        self._command_sender.moveToThread(self._command_thread)
+        self._send_requested.connect(self._command_sender.send)
+        self._command_sender.finished.connect(self._on_command_sent)
+        self._command_sender.failed.connect(self._on_command_failed)
+        self._command_thread.start()
 
         self.setWindowTitle("Atomberg Home Controller")
         self.resize(1000, 680)
 
-        self._apply_styles()
-
         self.stack = QStackedWidget()
         self.setCentralWidget(self.stack)
 
@@ -305,123 +569,6 @@ class AtombergWindow(QMainWindow):
 
         self.load_devices()
 
-    def _apply_styles(self) -> None:
-        self.setStyleSheet(
-            """
-            QMainWindow {
-                background: #0b1220;
-            }
-            QWidget {
-                color: #d6e1ff;
-                font-family: "Avenir Next", "Helvetica Neue", "Segoe UI";
-                font-size: 14px;
-            }
-            QLabel#title {
-                font-size: 34px;
-                font-weight: 700;
-                color: #f1f5ff;
-            }
-            QLabel#subtitle {
-                font-size: 15px;
-                color: #98acd8;
-            }
-            QFrame#card {
-                background: qlineargradient(x1:0, y1:0, x2:1, y2:1,
-                    stop:0 #121b31, stop:1 #1b2846);
-                border: 1px solid #2f4676;
-                border-radius: 14px;
-            }
-            QListWidget {
-                background: #111a2e;
-                border: 1px solid #2f4676;
-                border-radius: 10px;
-                padding: 6px;
-            }
-            QListWidget::item {
-                border-radius: 8px;
-                padding: 10px;
-                margin: 4px;
-                background: #16213b;
-            }
-            QListWidget::item:selected {
-                background: #2c4f94;
-                color: #f5f8ff;
-            }
-            QPushButton {
-                background: #28467f;
-                color: #f5f8ff;
-                border: 1px solid #3f63a8;
-                border-radius: 10px;
-                padding: 8px 14px;
-                font-weight: 600;
-            }
-            QPushButton:hover {
-                background: #365da7;
-            }
-            QPushButton:disabled {
-                background: #1b2a48;
-                color: #89a1d1;
-                border-color: #314a79;
-            }
-            QPushButton#primary {
-                background: #21a07a;
-                border: 1px solid #35bb93;
-            }
-            QPushButton#primary:hover {
-                background: #28bc90;
-            }
-            QPushButton#danger {
-                background: #a73c52;
-                border: 1px solid #c4576e;
-            }
-            QPushButton#danger:hover {
-                background: #bd4f67;
-            }
-            QPushButton#ghost {
-                background: #17233e;
-                border: 1px solid #2f4676;
-            }
-            QGroupBox {
-                border: 1px solid #2f4676;
-                border-radius: 12px;
-                margin-top: 12px;
-                padding-top: 16px;
-                background: #111a2f;
-                font-weight: 600;
-            }
-            QGroupBox::title {
-                left: 12px;
-                padding: 0 6px;
-                color: #9db3e0;
-            }
-            QComboBox, QSpinBox {
-                background: #16213b;
-                border: 1px solid #35558f;
-                border-radius: 8px;
-                padding: 6px;
-                min-height: 20px;
-            }
-            QSlider::groove:horizontal {
-                border: 1px solid #35558f;
-                background: #182645;
-                height: 8px;
-                border-radius: 4px;
-            }
-            QSlider::handle:horizontal {
-                background: #2ec59a;
-                border: 1px solid #63d9b7;
-                width: 20px;
-                margin: -8px 0;
-                border-radius: 10px;
-            }
-            QStatusBar {
-                background: #0e1629;
-                border-top: 1px solid #243657;
-                color: #9eb2dc;
-            }
-            """
-        )
-
     def _build_selection_page(self) -> QWidget:
         page = QWidget()
         layout = QVBoxLayout(page)
@@ -445,7 +592,7 @@ class AtombergWindow(QMainWindow):
         actions = QHBoxLayout()
         self.refresh_devices_btn = QPushButton("Refresh Devices")
         self.open_controls_btn = QPushButton("Open Controls")
-        self.open_controls_btn.setObjectName("primary")
+        self.open_controls_btn.setProperty("variant", "primary")
         self.open_controls_btn.setEnabled(False)
 
         actions.addWidget(self.refresh_devices_btn)
@@ -487,7 +634,7 @@ class AtombergWindow(QMainWindow):
         head_left.addWidget(self.selected_fan_state)
 
         self.back_btn = QPushButton("Back To Fans")
-        self.back_btn.setObjectName("ghost")
+        self.back_btn.setProperty("variant", "ghost")
         self.refresh_state_btn = QPushButton("Refresh State")
 
         right_buttons = QVBoxLayout()
@@ -500,7 +647,7 @@ class AtombergWindow(QMainWindow):
         quick = QGroupBox("Quick Actions")
         quick_layout = QHBoxLayout(quick)
         self.power_btn = QPushButton("Turn Power ON")
-        self.power_btn.setObjectName("primary")
+        self.power_btn.setProperty("variant", "primary")
         quick_layout.addWidget(self.power_btn)
 
         speed_box = QGroupBox("Speed")
@@ -537,14 +684,10 @@ class AtombergWindow(QMainWindow):
         self.refresh_state_btn.clicked.connect(self.refresh_selected_state)
         self.power_btn.clicked.connect(self.toggle_power)
         self.speed_slider.valueChanged.connect(self._on_speed_slider_changed)
-        self.speed_apply_btn.clicked.connect(
-            lambda: self.send_command({"speed": int(self.speed_slider.value())})
-        )
+        self.speed_apply_btn.clicked.connect(self._apply_speed)
         self.sleep_btn.clicked.connect(self.toggle_sleep)
         self.led_btn.clicked.connect(self.toggle_led)
-        self.timer_apply_btn.clicked.connect(
-            lambda: self.send_command({"timer": int(self.timer_combo.currentText())})
-        )
+        self.timer_apply_btn.clicked.connect(self._apply_timer)
 
         return page
 
@@ -552,8 +695,18 @@ class AtombergWindow(QMainWindow):
         self.speed_value.setText(str(value))
         self.speed_apply_btn.setText(f"Set Speed To {value}")
 
+    def _apply_speed(self) -> None:
+        self.send_command({"speed": self.speed_slider.value()})
+
+    def _apply_timer(self) -> None:
+        # Combo items are "0".."4", so the index is the timer slot.
+        self.send_command({"timer": self.timer_combo.currentIndex()})
+
     def _set_button_variant(self, button: QPushButton, variant: str) -> None:
-        button.setObjectName(variant)
+        # Re-polishing restyles the button, so skip it when nothing changes.
+        if button.property("variant") == variant:
+            return
+        button.setProperty("variant", variant)
         button.style().unpolish(button)
         button.style().polish(button)
         button.update()
@@ -590,18 +743,19 @@ class AtombergWindow(QMainWindow):
             f"Power: {'On' if power else 'Off'}  |  "
             f"Speed: {speed}"
         )
-        self.speed_slider.setValue(max(1, min(6, speed)))
+        # QSlider clamps to its 1..6 range itself.
+        self.speed_slider.setValue(speed)
         self.power_btn.setText("Turn Power OFF" if power else "Turn Power ON")
         self._set_button_variant(self.power_btn, "danger" if power else "primary")
         self.sleep_btn.setText("Turn Sleep OFF" if sleep else "Turn Sleep ON")
         self.led_btn.setText("Turn LED OFF" if led else "Turn LED ON")
-        self.timer_combo.setCurrentText(str(timer_hours if timer_hours in [0, 1, 2, 3, 4] else 0))
+        self.timer_combo.setCurrentIndex(timer_hours if 0 <= timer_hours <= 4 else 0)
         self.timer_apply_btn.setText(f"Set Timer (Current: {timer_hours}h)")
 
     def _selected_device_id(self) -> str:
-        if not self.selected_device or not self.selected_device.get("device_id"):
+        if self.selected_device_id is None:
             raise RuntimeError("No fan selected")
-        return str(self.selected_device["device_id"])
+        return self.selected_device_id
 
     def _run_action(self, message: str, fn: Callable[[], Dict[str, Any]]) -> Optional[Dict[str, Any]]:
         self.status.showMessage(message)
@@ -682,6 +836,8 @@ class AtombergWindow(QMainWindow):
             return
 
         self.selected_device = fan
+        device_id = fan.get("device_id")
+        self.selected_device_id = str(device_id) if device_id else None
         fan_name = fan.get("name", "Unnamed Fan")
         room = fan.get("room", "Unknown Room")
         self.selected_fan_label.setText(f"{fan_name}")
@@ -695,7 +851,7 @@ class AtombergWindow(QMainWindow):
         device_id = self._selected_device_id()
         result = self._run_action(
             "Fetching latest state...",
-            lambda: self.client.get_device_state(device_id),
+            partial(self.client.get_device_state, device_id),
         )
         if result is None:
             return
@@ -712,32 +868,33 @@ class AtombergWindow(QMainWindow):
         if not self.selected_device:
             return
         device_id = self._selected_device_id()
-        result = self._run_action(
-            "Sending local UDP command...",
-            lambda: self.client.send_local_command(device_id, command),
-        )
-        if result is None:
+        self.status.showMessage("Sending local UDP command...")
+        self._send_requested.emit(device_id, command)
+
+    def _on_command_sent(self, result: Dict[str, Any]) -> None:
+        # The user may have switched fans while the command was in flight.
+        if result.get("device_id") != self.selected_device_id:
             return
+        command = result.get("command", {})
 
         # Avoid extra API quota usage: update UI state optimistically.
         updated_state = dict(self.current_state)
         for key, value in command.items():
-            if key == "power":
-                updated_state["power"] = bool(value)
-            elif key == "speed":
-                updated_state["last_recorded_speed"] = int(value)
-            elif key == "sleep":
-                updated_state["sleep_mode"] = bool(value)
-            elif key == "led":
-                updated_state["led"] = bool(value)
-            elif key == "timer":
-                updated_state["timer_hours"] = int(value)
-        if updated_state:
+            field = _COMMAND_STATE_FIELDS.get(key)
+            if field is not None:
+                state_key, cast = field
+                updated_state[state_key] = cast(value)
+        # Re-sending the current speed/timer changes nothing on screen.
+        if updated_state and updated_state != self.current_state:
             self._apply_state_to_controls(updated_state)
         target_ip = result.get("target_ip")
         if isinstance(target_ip, str):
             self.status.showMessage(f"Command sent locally to {target_ip}:{self.client._command_port}", 3500)
 
+    def _on_command_failed(self, message: str) -> None:
+        self.status.showMessage("Request failed", 5000)
+        QMessageBox.critical(self, "Request Failed", message)
+
     def toggle_sleep(self) -> None:
         enabled = not bool(self.current_state.get("sleep_mode", False))
         self.send_command({"sleep": enabled})
@@ -754,6 +911,12 @@ class AtombergWindow(QMainWindow):
         self.stack.setCurrentWidget(self.selection_page)
         self.status.showMessage("Choose another fan", 2000)
 
+    def closeEvent(self, event: QCloseEvent) -> None:
+        self._command_thread.quit()
+        self._command_thread.wait()
+        self.client.close()
+        super().closeEvent(event)
+
 
 def build_client() -> AtombergClient:
     env = load_env(Path(__file__).with_name(".env"))
@@ -809,27 +972,29 @@ def build_cli_parser() -> argparse.ArgumentParser:
     return parser
 
 
+# CLI subcommands that map directly onto one local UDP command.
+_LOCAL_CLI_COMMANDS: Dict[str, Callable[[argparse.Namespace], Dict[str, Any]]] = {
+    "on": lambda args: {"power": True},
+    "off": lambda args: {"power": False},
+    "speed": lambda args: {"speed": args.value},
+    "sleep": lambda args: {"sleep": args.mode == "on"},
+    "timer": lambda args: {"timer": args.value},
+    "led": lambda args: {"led": args.mode == "on"},
+}
+
+
 def run_cli(args: argparse.Namespace, client: AtombergClient) -> int:
     client.start_udp_listener()
-    if args.cmd == "devices":
+    build_command = _LOCAL_CLI_COMMANDS.get(args.cmd)
+    if build_command is not None:
+        out = client.send_local_command(args.device_id, build_command(args))
+    elif args.cmd == "devices":
         out = client.list_devices()
     elif args.cmd == "state":
         out = client.get_device_state(args.device_id)
-    elif args.cmd == "on":
-        out = client.send_local_command(args.device_id, {"power": True})
-    elif args.cmd == "off":
-        out = client.send_local_command(args.device_id, {"power": False})
-    elif args.cmd == "speed":
-        out = client.send_local_command(args.device_id, {"speed": args.value})
-    elif args.cmd == "sleep":
-        out = client.send_local_command(args.device_id, {"sleep": args.mode == "on"})
-    elif args.cmd == "timer":
-        out = client.send_local_command(args.device_id, {"timer": args.value})
-    elif args.cmd == "led":
-        out = client.send_local_command(args.device_id, {"led": args.mode == "on"})
     elif args.cmd == "raw":
         try:
-            command_payload = json.loads(args.command_json)
+            command_payload = _loads(args.command_json)
         except json.JSONDecodeError as exc:
             raise RuntimeError(f"Invalid JSON for raw command: {exc}") from exc
         if not isinstance(command_payload, dict):
@@ -844,6 +1009,7 @@ def run_cli(args: argparse.Namespace, client: AtombergClient) -> int:
 
 def run_gui(client: AtombergClient) -> int:
     app = QApplication(sys.argv)
+    app.setStyleSheet(_STYLESHEET)
     window = AtombergWindow(client)
     window.show()
     return app.exec()
@@ -857,7 +1023,10 @@ def main() -> int:
     if args.cmd is None or args.cmd == "gui":
         return run_gui(client)
 
-    return run_cli(args, client)
+    try:
+        return run_cli(args, client)
+    finally:
+        client.close()
 
 
 if __name__ == "__main__":